@@ -84,12 +84,43 @@ DATABASES = {
         'PASSWORD': os.getenv('DB_PASSWORD'),
         'HOST': os.getenv('DB_HOST'),
         'PORT': os.getenv('DB_PORT'),
+        # Reuse connections across requests instead of reconnecting each time
+        'CONN_MAX_AGE': int(os.getenv('DB_CONN_MAX_AGE', '60')),
+        'CONN_HEALTH_CHECKS': True,
         'OPTIONS': {
             'sslmode': os.getenv('DB_SSLMODE', 'require'),
         },
     }
 }
 
+# Cache
+# Cached listings and stats are invalidated from signal handlers, so every
+# worker process must share one cache. Redis is used when REDIS_URL is set;
+# otherwise production falls back to the database cache table (created by the
+# release step in the Procfile). The local-memory cache is per process and is
+# only used for single-process development servers.
+REDIS_URL = os.getenv("REDIS_URL")
+if REDIS_URL:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+            'LOCATION': REDIS_URL,
+        }
+    }
+elif DEBUG:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        }
+    }
+else:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.db.DatabaseCache',
+            'LOCATION': 'django_cache',
+        }
+    }
+
 # Password validation
 AUTH_PASSWORD_VALIDATORS = [
     {'NAME': 'django.contrib.auth.password_validation.UserAttributeSimilarityValidator'},
@@ -149,3 +180,11 @@ ML_MODELS = {
     'CONFIDENCE_THRESHOLD': 0.5,  # Minimum confidence score
     'IOU_THRESHOLD': 0.45,        # IoU threshold for non-max suppression
 }
+
+# User stats settings
+# Buffer counter increments in-process and write them in batches from a
+# background thread every USER_STATS_FLUSH_INTERVAL seconds. Buffered deltas
+# are flushed on normal worker exit, but up to one interval of increments is
+# lost if a worker is killed (e.g. SIGKILL or OOM).
+USER_STATS_BUFFERED = os.getenv("USER_STATS_BUFFERED", "False") == "True"
+USER_STATS_FLUSH_INTERVAL = int(os.getenv("USER_STATS_FLUSH_INTERVAL", "10"))  # seconds
@@ -1,5 +1,6 @@
 import time
 import os
+import logging
 import random
 import cv2
 import numpy as np
@@ -11,6 +12,8 @@ from PIL import Image, ImageDraw
 from documents.models import Document, DocumentScan, SensitiveInformation
 from .models import DetectionModel, DetectionJob
 
+logger = logging.getLogger(__name__)
+
 
 class DetectionService:
     """
@@ -31,12 +34,13 @@ class DetectionService:
             'IOU_THRESHOLD', 0.45
         )
     
-    def analyze_document(self, document_id):
+    def analyze_document(self, document_id, document=None):
         """
         Main method to analyze a document for sensitive information
         
         Args:
             document_id (int): ID of the document to analyze
+            document (Document, optional): Already-fetched document, skips the lookup
             
         Returns:
             dict: Detection results
@@ -44,10 +48,11 @@ class DetectionService:
         start_time = time.time()
         
         # Get the document
-        try:
-            document = Document.objects.get(id=document_id)
-        except Document.DoesNotExist:
-            return {"error": "Document not found"}
+        if document is None:
+            try:
+                document = Document.objects.get(id=document_id)
+            except Document.DoesNotExist:
+                return {"error": "Document not found"}
         
         # Create a detection job
         job = DetectionJob.objects.create(
@@ -285,5 +290,5 @@ class DetectionService:
                 return document.file.file
                 
         except Exception as e:
-            print(f"Error creating redacted file: {str(e)}")
+            logger.error("Error creating redacted file: %s", e)
             return None 
\ No newline at end of file
@@ -1,7 +1,13 @@
-from django.db import models
+from django.core.cache import cache
+from django.db import models, transaction
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
 from django.utils.translation import gettext_lazy as _
 from documents.models import Document
 
+# Cache key for the serialized list of active detection models
+ACTIVE_MODELS_CACHE_KEY = 'detection:active_models:v1'
+
 
 class DetectionModel(models.Model):
     """
@@ -53,4 +59,15 @@ class DetectionJob(models.Model):
     class Meta:
         ordering = ['-started_at']
         verbose_name = _("Detection Job")
-        verbose_name_plural = _("Detection Jobs") 
\ No newline at end of file
+        verbose_name_plural = _("Detection Jobs") 
+
+
+@receiver(post_save, sender=DetectionModel)
+@receiver(post_delete, sender=DetectionModel)
+def invalidate_active_models_cache(sender, **kwargs):
+    """
+    Drop the cached active model listing whenever a detection model changes
+    
+    Deferred until commit so a concurrent request cannot re-cache the old listing.
+    """
+    transaction.on_commit(lambda: cache.delete(ACTIVE_MODELS_CACHE_KEY))
@@ -1,6 +1,13 @@
 from rest_framework import serializers
+from django.db import transaction
+from django.utils import timezone
 from .models import DetectionModel, DetectionJob
 from documents.models import Document, DocumentScan, SensitiveInformation
+from documents.serializers import SENSITIVE_TYPE_DISPLAY
+
+# Risk level for an ML payload indexed by its sensitive item count:
+# none is low, one or two is medium, three or more is high
+ML_RISK_LEVELS = ('low', 'medium', 'medium', 'high')
 
 
 class DetectionModelSerializer(serializers.ModelSerializer):
@@ -52,15 +59,21 @@ class AnalyzeDocumentSerializer(serializers.Serializer):
     """
     document_id = serializers.IntegerField()
     
-    def validate_document_id(self, value):
+    def validate(self, attrs):
         try:
-            document = Document.objects.get(id=value)
-            # Check if the document belongs to the current user
-            if document.user != self.context['request'].user:
-                raise serializers.ValidationError("You don't have permission to analyze this document")
-            return value
+            document = Document.objects.get(id=attrs['document_id'])
         except Document.DoesNotExist:
-            raise serializers.ValidationError("Document not found")
+            raise serializers.ValidationError({'document_id': "Document not found"})
+        
+        # Check if the document belongs to the current user without loading the user row
+        if document.user_id != self.context['request'].user.pk:
+            raise serializers.ValidationError(
+                {'document_id': "You don't have permission to analyze this document"}
+            )
+        
+        # Hand the fetched document on so the detection service can skip its own lookup
+        attrs['document'] = document
+        return attrs
 
 
 class SensitiveItemSerializer(serializers.Serializer):
@@ -73,6 +86,27 @@ class SensitiveItemSerializer(serializers.Serializer):
     count = serializers.IntegerField(default=1)
 
 
+class SensitiveItemResultSerializer(serializers.Serializer):
+    """
+    Serializer for sensitive items returned straight after an analysis
+    
+    Renders the validated item dicts, so nothing is read back from the database.
+    """
+    type = serializers.CharField()
+    type_display = serializers.SerializerMethodField()
+    confidence = serializers.FloatField()
+    location = serializers.JSONField(default=None)
+    count = serializers.IntegerField()
+    redacted = serializers.SerializerMethodField()
+    
+    def get_type_display(self, obj):
+        return SENSITIVE_TYPE_DISPLAY.get(obj['type'], obj['type'])
+    
+    def get_redacted(self, obj):
+        # Items have only just been detected, so none are redacted yet
+        return False
+
+
 class DetectionResultSerializer(serializers.Serializer):
     """
     Serializer for detection results
@@ -82,6 +116,7 @@ class DetectionResultSerializer(serializers.Serializer):
     processing_time = serializers.FloatField()
     sensitive_items = SensitiveItemSerializer(many=True)
     
+    @transaction.atomic
     def create(self, validated_data):
         """
         Create DocumentScan and SensitiveInformation records
@@ -98,16 +133,14 @@ class DetectionResultSerializer(serializers.Serializer):
             **validated_data
         )
         
-        # Create sensitive information records
-        for item in sensitive_items:
-            SensitiveInformation.objects.create(
-                scan=scan,
-                **item
-            )
+        # Create sensitive information records in a single INSERT
+        SensitiveInformation.objects.bulk_create(
+            [SensitiveInformation(scan=scan, **item) for item in sensitive_items],
+            batch_size=500
+        )
         
-        # Mark the document as processed
-        document.processed = True
-        document.save()
+        # Mark the document as processed without rewriting the whole row
+        Document.objects.filter(pk=document.pk).update(processed=True, updated_at=timezone.now())
         
         return scan
 
@@ -118,7 +151,7 @@ class MLAnalysisPayloadSerializer(serializers.Serializer):
     """
     document_id = serializers.IntegerField()
     detection_types = serializers.ListField(child=serializers.CharField())
-    sensitive_items_count = serializers.IntegerField()
+    sensitive_items_count = serializers.IntegerField(min_value=0)
     processing_time = serializers.FloatField()
     source = serializers.CharField()
     sensitive_items = SensitiveItemSerializer(many=True, required=False)
@@ -128,6 +161,7 @@ class MLAnalysisPayloadSerializer(serializers.Serializer):
             raise serializers.ValidationError("Source must be 'ml_model' for ML payloads")
         return value
     
+    @transaction.atomic
     def create_ml_analysis_result(self, validated_data):
         """
         Create DocumentScan and SensitiveInformation records from ML payload
@@ -141,12 +175,7 @@ class MLAnalysisPayloadSerializer(serializers.Serializer):
         document = Document.objects.get(id=document_id)
         
         # Determine risk level based on sensitive items count
-        if sensitive_items_count == 0:
-            risk_level = 'low'
-        elif sensitive_items_count <= 2:
-            risk_level = 'medium'
-        else:
-            risk_level = 'high'
+        risk_level = ML_RISK_LEVELS[min(sensitive_items_count, len(ML_RISK_LEVELS) - 1)]
         
         # Create the scan record
         scan = DocumentScan.objects.create(
@@ -155,19 +184,25 @@ class MLAnalysisPayloadSerializer(serializers.Serializer):
             processing_time=processing_time
         )
         
-        # Create sensitive information records if provided
-        for item in sensitive_items:
-            SensitiveInformation.objects.create(
-                scan=scan,
-                type=item.get('type', 'other'),
-                confidence=item.get('confidence', 0.0),
-                location=item.get('location'),
-                count=item.get('count', 1),
-                redacted=False
+        # Create sensitive information records if provided, in a single INSERT.
+        # SensitiveItemSerializer has already coerced the values and filled in
+        # count, so only the optional location needs a lookup default.
+        if sensitive_items:
+            SensitiveInformation.objects.bulk_create(
+                [
+                    SensitiveInformation(
+                        scan=scan,
+                        type=item['type'],
+                        confidence=item['confidence'],
+                        location=item.get('location'),
+                        count=item['count']
+                    )
+                    for item in sensitive_items
+                ],
+                batch_size=500
             )
         
-        # Mark the document as processed
-        document.processed = True
-        document.save()
+        # Mark the document as processed without rewriting the whole row
+        Document.objects.filter(pk=document.pk).update(processed=True, updated_at=timezone.now())
         
         return scan 
\ No newline at end of file
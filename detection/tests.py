@@ -0,0 +1,189 @@
+from unittest.mock import patch
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import SimpleTestCase, override_settings
+from rest_framework.test import APITestCase
+from documents.models import Document, SensitiveInformation
+from detection.models import DetectionModel, DetectionJob
+from detection.serializers import SensitiveItemResultSerializer
+from users.services.stats import StatsBuffer, UserStatsService, flush_pending_stats
+
+User = get_user_model()
+
+
+class DetectionModelViewSetTests(APITestCase):
+    """
+    Tests for the cached detection model listing
+    """
+
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(
+            username='models',
+            email='models@example.com',
+            password='testpassword123'
+        )
+        self.client.force_authenticate(self.user)
+        self.model = DetectionModel.objects.create(name='YOLO', model_type='yolo', version='1')
+
+    def test_saving_a_model_invalidates_the_listing(self):
+        response = self.client.get('/api/detection/models/')
+        self.assertEqual([item['version'] for item in response.data], ['1'])
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.model.version = '2'
+            self.model.save()
+            DetectionModel.objects.create(name='OCR', model_type='ocr', version='1', active=False)
+
+        response = self.client.get('/api/detection/models/')
+        self.assertEqual([item['version'] for item in response.data], ['2'])
+
+
+class DetectionJobViewSetTests(APITestCase):
+    """
+    Tests for the detection job listing
+    """
+
+    def setUp(self):
+        self.user = User.objects.create_user(
+            username='jobs',
+            email='jobs@example.com',
+            password='testpassword123'
+        )
+        self.client.force_authenticate(self.user)
+
+        document = Document.objects.create(
+            user=self.user,
+            title='Scan me',
+            file='documents/scan.jpg',
+            file_type='image'
+        )
+        models_used = [
+            DetectionModel.objects.create(name='YOLO', model_type='yolo', version='1'),
+            DetectionModel.objects.create(name='OCR', model_type='ocr', version='1'),
+        ]
+        for _ in range(3):
+            job = DetectionJob.objects.create(document=document, status='completed')
+            job.models_used.set(models_used)
+
+    def test_list_query_count_does_not_grow_with_jobs(self):
+        # One query for the jobs (with their documents) and one for models_used
+        with self.assertNumQueries(2):
+            response = self.client.get('/api/detection/jobs/')
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.data), 3)
+        self.assertEqual(len(response.data[0]['models_used']), 2)
+
+
+class SensitiveItemResultSerializerTests(SimpleTestCase):
+    """
+    Tests for rendering freshly detected items
+    """
+
+    def test_renders_validated_item_without_location(self):
+        data = SensitiveItemResultSerializer({'type': 'email', 'confidence': 0.8, 'count': 2}).data
+        self.assertEqual(data, {
+            'type': 'email',
+            'type_display': 'Email Address',
+            'confidence': 0.8,
+            'location': None,
+            'count': 2,
+            'redacted': False
+        })
+
+
+class AnalysisViewSetTests(APITestCase):
+    """
+    Tests for backend document analysis
+    """
+
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(
+            username='analyst',
+            email='analyst@example.com',
+            password='testpassword123'
+        )
+        self.client.force_authenticate(self.user)
+        self.document = Document.objects.create(
+            user=self.user,
+            title='Passport scan',
+            file='documents/passport.jpg',
+            file_type='image'
+        )
+
+    @patch('detection.views.DetectionService.analyze_document')
+    def test_analysis_with_detected_item(self, analyze_document):
+        analyze_document.return_value = {
+            'document_id': self.document.id,
+            'risk_level': 'high',
+            'processing_time': 0.5,
+            'sensitive_items': [
+                {'type': 'passport', 'confidence': 0.95, 'location': {'x': 1, 'y': 2}, 'count': 1}
+            ]
+        }
+
+        response = self.client.post(
+            '/api/detection/analyze/',
+            {'document_id': self.document.id},
+            format='json'
+        )
+
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(response.data['sensitive_items_count'], 1)
+        self.assertEqual(response.data['sensitive_items'][0], {
+            'type': 'passport',
+            'type_display': 'Passport',
+            'confidence': 0.95,
+            'location': {'x': 1, 'y': 2},
+            'count': 1,
+            'redacted': False
+        })
+        self.assertEqual(SensitiveInformation.objects.filter(scan__document=self.document).count(), 1)
+
+    @patch('detection.views.DetectionService.analyze_document')
+    def test_analysis_refreshes_cached_stats(self, analyze_document):
+        analyze_document.return_value = {
+            'document_id': self.document.id,
+            'risk_level': 'low',
+            'processing_time': 0.5,
+            'sensitive_items': []
+        }
+        self.assertEqual(UserStatsService.get_user_stats(self.user)['total_non_detected_items'], 0)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post(
+                '/api/detection/analyze/',
+                {'document_id': self.document.id},
+                format='json'
+            )
+
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(UserStatsService.get_user_stats(self.user)['total_non_detected_items'], 1)
+
+    @override_settings(USER_STATS_BUFFERED=True, USER_STATS_FLUSH_INTERVAL=3600)
+    @patch('detection.views.DetectionService.analyze_document')
+    def test_buffered_stats_are_written_on_flush(self, analyze_document):
+        analyze_document.return_value = {
+            'document_id': self.document.id,
+            'risk_level': 'low',
+            'processing_time': 0.5,
+            'sensitive_items': []
+        }
+        StatsBuffer.drain()
+        self.addCleanup(StatsBuffer.drain)
+
+        response = self.client.post(
+            '/api/detection/analyze/',
+            {'document_id': self.document.id},
+            format='json'
+        )
+
+        self.assertEqual(response.status_code, 201)
+        self.user.stats_counter.refresh_from_db()
+        self.assertEqual(self.user.stats_counter.total_non_detected_items, 0)
+
+        self.assertEqual(flush_pending_stats(), 1)
+        self.user.stats_counter.refresh_from_db()
+        self.assertEqual(self.user.stats_counter.total_non_detected_items, 1)
@@ -2,16 +2,22 @@ from rest_framework import viewsets, mixins, permissions, status, filters
 from rest_framework.decorators import action
 from rest_framework.response import Response
 from django_filters.rest_framework import DjangoFilterBackend
-from django.db.models import F
-from .models import DetectionModel, DetectionJob
+from django.core.cache import cache
+from django.db import transaction
+from users.services.stats import UserStatsService
+from .models import DetectionModel, DetectionJob, ACTIVE_MODELS_CACHE_KEY
 from .serializers import (
     DetectionModelSerializer,
     DetectionJobSerializer,
     AnalyzeDocumentSerializer,
     DetectionResultSerializer,
-    MLAnalysisPayloadSerializer
+    MLAnalysisPayloadSerializer,
+    SensitiveItemResultSerializer
 )
 from .detection_service import DetectionService
+import logging
+
+logger = logging.getLogger(__name__)
 
 
 class DetectionModelViewSet(mixins.ListModelMixin,
@@ -27,6 +33,24 @@ class DetectionModelViewSet(mixins.ListModelMixin,
     filterset_fields = ['model_type']
     ordering_fields = ['name', 'created_at']
     ordering = ['name']
+    
+    def list(self, request, *args, **kwargs):
+        """
+        Serve the unfiltered listing from cache since active models rarely change
+        """
+        # Filtered or reordered listings go through the regular queryset path
+        if request.query_params:
+            return super().list(request, *args, **kwargs)
+        
+        data = cache.get_or_set(
+            ACTIVE_MODELS_CACHE_KEY,
+            lambda: self.get_serializer(
+                self.get_queryset().order_by(*self.ordering),
+                many=True
+            ).data,
+            timeout=300
+        )
+        return Response(data)
 
 
 class DetectionJobViewSet(mixins.ListModelMixin,
@@ -46,7 +70,12 @@ class DetectionJobViewSet(mixins.ListModelMixin,
         """
         Filter jobs to return only those related to the current user's documents
         """
-        return DetectionJob.objects.filter(document__user=self.request.user)
+        return (
+            DetectionJob.objects
+            .filter(document__user=self.request.user)
+            .select_related('document')
+            .prefetch_related('models_used')
+        )
 
 
 class AnalysisViewSet(viewsets.ViewSet):
@@ -76,22 +105,25 @@ class AnalysisViewSet(viewsets.ViewSet):
         
         if serializer.is_valid():
             try:
-                # Create analysis result from ML payload
-                scan = serializer.create_ml_analysis_result(serializer.validated_data)
-                
-                # Update user statistics using F() expressions
                 user = request.user
                 sensitive_count = serializer.validated_data['sensitive_items_count']
                 
-                if sensitive_count > 0:
-                    user.total_sensitive_items_detected = F('total_sensitive_items_detected') + sensitive_count
-                    user.save(update_fields=["total_sensitive_items_detected"])
-                else:
-                    user.total_non_detected_items = F('total_non_detected_items') + 1
-                    user.save(update_fields=["total_non_detected_items"])
+                # Record the scan and the user statistics in a single commit
+                with transaction.atomic():
+                    # Create analysis result from ML payload
+                    scan = serializer.create_ml_analysis_result(serializer.validated_data)
+                    
+                    # The service defers the cached stats invalidation until this commits
+                    if sensitive_count > 0:
+                        UserStatsService.increment_sensitive_items_detected(user, sensitive_count)
+                    else:
+                        UserStatsService.increment_non_detected_items(user)
                 
                 # Log the ML detection stats
-                print(f"✅ ML detection stats recorded: document_id={scan.document.id}, sensitive_items_count={sensitive_count}")
+                logger.info(
+                    "ML detection stats recorded: document_id=%s, sensitive_items_count=%s",
+                    scan.document_id, sensitive_count
+                )
                 
                 # Return success acknowledgment
                 response_data = {
@@ -122,10 +154,11 @@ class AnalysisViewSet(viewsets.ViewSet):
         )
         if serializer.is_valid():
             document_id = serializer.validated_data['document_id']
+            document = serializer.validated_data['document']
             
             # Call the detection service
             detection_service = DetectionService()
-            results = detection_service.analyze_document(document_id)
+            results = detection_service.analyze_document(document_id, document=document)
             
             # Check for error
             if 'error' in results:
@@ -139,20 +172,21 @@ class AnalysisViewSet(viewsets.ViewSet):
             if result_serializer.is_valid():
                 scan = result_serializer.save()
                 
-                # Track sensitive items detected using F() expressions for atomic updates
+                # Track sensitive items detected. The validated items are exactly
+                # what was just written, so there is no need to read them back from
+                # the database.
                 user = request.user
-                sensitive_count = scan.sensitive_information.count()
+                sensitive_items = result_serializer.validated_data['sensitive_items']
+                sensitive_count = len(sensitive_items)
                 
                 if sensitive_count > 0:
                     # Increment sensitive items detected counter
-                    user.total_sensitive_items_detected = F('total_sensitive_items_detected') + sensitive_count
-                    user.save(update_fields=["total_sensitive_items_detected"])
-                    print(f"✅ Found {sensitive_count} sensitive items for user {user.id}")
+                    UserStatsService.increment_sensitive_items_detected(user, sensitive_count)
+                    logger.info("Found %s sensitive items for user %s", sensitive_count, user.id)
                 else:
                     # If no sensitive items detected, increment non-detected counter
-                    user.total_non_detected_items = F('total_non_detected_items') + 1
-                    user.save(update_fields=["total_non_detected_items"])
-                    print(f"ℹ️ No sensitive items found for user {user.id}")
+                    UserStatsService.increment_non_detected_items(user)
+                    logger.info("No sensitive items found for user %s", user.id)
                 
                 # Return the scan results
                 response_data = {
@@ -162,17 +196,7 @@ class AnalysisViewSet(viewsets.ViewSet):
                     'processing_time': scan.processing_time,
                     'scan_date': scan.scan_date,
                     'sensitive_items_count': sensitive_count,
-                    'sensitive_items': [
-                        {
-                            'type': si.type,
-                            'type_display': si.get_type_display(),
-                            'confidence': si.confidence,
-                            'location': si.location,
-                            'count': si.count,
-                            'redacted': si.redacted
-                        }
-                        for si in scan.sensitive_information.all()
-                    ]
+                    'sensitive_items': SensitiveItemResultSerializer(sensitive_items, many=True).data
                 }
                 return Response(response_data, status=status.HTTP_201_CREATED)
             else:
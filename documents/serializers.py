@@ -1,12 +1,15 @@
 from rest_framework import serializers
 from .models import Document, DocumentScan, SensitiveInformation
 
+# Display labels for sensitive information types, resolved once at import
+SENSITIVE_TYPE_DISPLAY = dict(SensitiveInformation.TYPE_CHOICES)
+
 
 class SensitiveInformationSerializer(serializers.ModelSerializer):
     """
     Serializer for sensitive information detected in documents
     """
-    type_display = serializers.CharField(source='get_type_display', read_only=True)
+    type_display = serializers.SerializerMethodField()
     
     class Meta:
         model = SensitiveInformation
@@ -19,6 +22,9 @@ class SensitiveInformationSerializer(serializers.ModelSerializer):
             'count', 
             'redacted'
         ]
+    
+    def get_type_display(self, obj):
+        return SENSITIVE_TYPE_DISPLAY.get(obj.type, obj.type)
 
 
 class DocumentScanSerializer(serializers.ModelSerializer):
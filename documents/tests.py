@@ -0,0 +1,63 @@
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from rest_framework.test import APITestCase
+from documents.models import Document
+from users.services.stats import UserStatsService
+
+User = get_user_model()
+
+
+class DocumentViewSetTests(APITestCase):
+    """
+    Tests for the document endpoints
+    """
+
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(
+            username='owner',
+            email='owner@example.com',
+            password='testpassword123'
+        )
+        self.client.force_authenticate(self.user)
+        self.document = Document.objects.create(
+            user=self.user,
+            title='Invoice',
+            file='documents/invoice.pdf',
+            file_type='pdf'
+        )
+
+    def test_marking_processed_refreshes_cached_stats(self):
+        self.assertEqual(UserStatsService.get_user_stats(self.user)['total_documents_processed'], 0)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.patch(
+                f'/api/documents/{self.document.id}/',
+                {'processed': True},
+                format='json'
+            )
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(UserStatsService.get_user_stats(self.user)['total_documents_processed'], 1)
+
+    def test_list_etag_tracks_changes_and_query(self):
+        response = self.client.get('/api/documents/')
+        self.assertEqual(response.status_code, 200)
+        etag = response['ETag']
+
+        response = self.client.get('/api/documents/', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+
+        filtered = self.client.get('/api/documents/?file_type=pdf')
+        self.assertNotEqual(filtered['ETag'], etag)
+
+        self.client.patch(f'/api/documents/{self.document.id}/', {'title': 'Paid invoice'}, format='json')
+        response = self.client.get('/api/documents/', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        updated_etag = response['ETag']
+        self.assertNotEqual(updated_etag, etag)
+
+        self.client.delete(f'/api/documents/{self.document.id}/')
+        response = self.client.get('/api/documents/', HTTP_IF_NONE_MATCH=updated_etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response['ETag'], updated_etag)
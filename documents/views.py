@@ -2,13 +2,19 @@ from rest_framework import viewsets, mixins, permissions, status, filters
 from rest_framework.decorators import action
 from rest_framework.response import Response
 from django_filters.rest_framework import DjangoFilterBackend
-from django.db.models import F
+from django.db.models import Prefetch, Max, Count
+from django.utils.cache import get_conditional_response, quote_etag
+from users.services.stats import UserStatsService
 from .models import Document, DocumentScan
 from .serializers import (
     DocumentSerializer,
     DocumentWithScansSerializer,
     DocumentScanSerializer
 )
+import hashlib
+import logging
+
+logger = logging.getLogger(__name__)
 
 
 class DocumentViewSet(viewsets.ModelViewSet):
@@ -32,9 +38,41 @@ class DocumentViewSet(viewsets.ModelViewSet):
             return Document.objects.none()
         
         # Only return documents for authenticated users
-        if self.request.user.is_authenticated:
-            return Document.objects.filter(user=self.request.user)
-        return Document.objects.none()
+        if not self.request.user.is_authenticated:
+            return Document.objects.none()
+        
+        queryset = Document.objects.filter(user=self.request.user)
+        
+        # Detail views render scans and their sensitive items, so load them up front
+        if self.action in ('retrieve', 'scans'):
+            queryset = queryset.prefetch_related(
+                Prefetch(
+                    'scans',
+                    queryset=DocumentScan.objects.prefetch_related('sensitive_information').order_by('-scan_date')
+                )
+            )
+        return queryset
+    
+    def list(self, request, *args, **kwargs):
+        """
+        Answer polling clients with 304 Not Modified while their documents are unchanged
+        """
+        # Newest update plus row count catches edits, uploads and deletions
+        stamp = self.get_queryset().aggregate(
+            latest=Max('updated_at'),
+            total=Count('id')
+        )
+        etag = quote_etag(hashlib.md5(
+            f"{request.user.pk}:{stamp['latest']}:{stamp['total']}:{request.get_full_path()}".encode()
+        ).hexdigest())
+        
+        not_modified = get_conditional_response(request, etag=etag)
+        if not_modified is not None:
+            return not_modified
+        
+        response = super().list(request, *args, **kwargs)
+        response['ETag'] = etag
+        return response
     
     def get_serializer_class(self):
         """
@@ -49,29 +87,25 @@ class DocumentViewSet(viewsets.ModelViewSet):
         Override to track document upload
         """
         document = serializer.save(user=self.request.user)
-        # Increment documents saved counter using F() expression for atomic update
-        user = self.request.user
-        user.total_documents_saved = F('total_documents_saved') + 1
-        user.save(update_fields=["total_documents_saved"])
+        UserStatsService.increment_documents_saved(self.request.user)
     
     def perform_update(self, serializer):
         """
         Override to track document processing
         """
-        # Get the current state before update
-        prev_instance = self.get_object()
+        # Capture the current state before update from the instance DRF already loaded
+        was_processed = serializer.instance.processed
         instance = serializer.save()
         user = self.request.user
 
         # If the processed field changes from False → True, increment counter
-        if not prev_instance.processed and instance.processed:
-            user.total_documents_processed = F('total_documents_processed') + 1
-            user.save(update_fields=["total_documents_processed"])
-            print(f"✅ Document {instance.id} marked as processed for user {user.id}")
-        elif prev_instance.processed and not instance.processed:
-            print(f"⚠️ Document {instance.id} marked as unprocessed for user {user.id}")
+        if not was_processed and instance.processed:
+            UserStatsService.increment_documents_processed(user)
+            logger.info("Document %s marked as processed for user %s", instance.id, user.id)
+        elif was_processed and not instance.processed:
+            logger.warning("Document %s marked as unprocessed for user %s", instance.id, user.id)
         else:
-            print(f"ℹ️ Document {instance.id} processed status unchanged: {instance.processed}")
+            logger.debug("Document %s processed status unchanged: %s", instance.id, instance.processed)
     
     @action(detail=True, methods=['get'])
     def scans(self, request, pk=None):
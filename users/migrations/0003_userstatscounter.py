@@ -0,0 +1,89 @@
+# Generated by Django 4.2 on 2026-10-15 10:12
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+STAT_FIELDS = (
+    'total_documents_saved',
+    'total_documents_processed',
+    'total_documents_shared',
+    'total_sensitive_items_detected',
+    'total_non_detected_items',
+)
+
+
+def copy_counters_to_stats_table(apps, schema_editor):
+    User = apps.get_model('users', 'User')
+    UserStatsCounter = apps.get_model('users', 'UserStatsCounter')
+    UserStatsCounter.objects.bulk_create(
+        [
+            UserStatsCounter(user_id=row['id'], **{field: row[field] for field in STAT_FIELDS})
+            for row in User.objects.values('id', *STAT_FIELDS).iterator()
+        ],
+        batch_size=1000
+    )
+
+
+def copy_counters_to_user_table(apps, schema_editor):
+    User = apps.get_model('users', 'User')
+    UserStatsCounter = apps.get_model('users', 'UserStatsCounter')
+    for row in UserStatsCounter.objects.values('user_id', *STAT_FIELDS).iterator():
+        User.objects.filter(pk=row.pop('user_id')).update(**row)
+
+
+def set_stats_fillfactor(apps, schema_editor):
+    # Leave free space in each page so counter updates can stay HOT updates
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    UserStatsCounter = apps.get_model('users', 'UserStatsCounter')
+    table = schema_editor.quote_name(UserStatsCounter._meta.db_table)
+    schema_editor.execute(f"ALTER TABLE {table} SET (fillfactor = 70)")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('users', '0002_user_total_documents_processed_and_more'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='UserStatsCounter',
+            fields=[
+                ('user', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='stats_counter', serialize=False, to=settings.AUTH_USER_MODEL)),
+                ('total_documents_saved', models.PositiveBigIntegerField(default=0, help_text='Total documents uploaded/saved')),
+                ('total_documents_processed', models.PositiveBigIntegerField(default=0, help_text='Total documents processed')),
+                ('total_documents_shared', models.PositiveBigIntegerField(default=0, help_text='Total documents shared')),
+                ('total_sensitive_items_detected', models.PositiveBigIntegerField(default=0, help_text='Total sensitive items found')),
+                ('total_non_detected_items', models.PositiveBigIntegerField(default=0, help_text='Total items that were not detected as sensitive')),
+            ],
+            options={
+                'verbose_name': 'User Stats Counter',
+                'verbose_name_plural': 'User Stats Counters',
+            },
+        ),
+        migrations.RunPython(set_stats_fillfactor, migrations.RunPython.noop),
+        migrations.RunPython(copy_counters_to_stats_table, copy_counters_to_user_table),
+        migrations.RemoveField(
+            model_name='user',
+            name='total_documents_processed',
+        ),
+        migrations.RemoveField(
+            model_name='user',
+            name='total_documents_saved',
+        ),
+        migrations.RemoveField(
+            model_name='user',
+            name='total_documents_shared',
+        ),
+        migrations.RemoveField(
+            model_name='user',
+            name='total_non_detected_items',
+        ),
+        migrations.RemoveField(
+            model_name='user',
+            name='total_sensitive_items_detected',
+        ),
+    ]
@@ -1,4 +1,6 @@
 from django.db import models
+from django.db.models.signals import post_save
+from django.dispatch import receiver
 from django.contrib.auth.models import AbstractUser
 from django.utils.translation import gettext_lazy as _
 
@@ -10,13 +12,6 @@ class User(AbstractUser):
     profile_image = models.ImageField(upload_to='profile_images/', null=True, blank=True)
     email = models.EmailField(_("email address"), unique=True)
     
-    # User activity tracking fields
-    total_documents_saved = models.PositiveIntegerField(default=0, help_text="Total documents uploaded/saved")
-    total_documents_processed = models.PositiveIntegerField(default=0, help_text="Total documents processed")
-    total_documents_shared = models.PositiveIntegerField(default=0, help_text="Total documents shared")
-    total_sensitive_items_detected = models.PositiveIntegerField(default=0, help_text="Total sensitive items found")
-    total_non_detected_items = models.PositiveIntegerField(default=0, help_text="Total items that were not detected as sensitive")
-    
     # Override the username field to use email
     USERNAME_FIELD = 'email'
     REQUIRED_FIELDS = ['username', 'first_name', 'last_name']
@@ -24,6 +19,39 @@ class User(AbstractUser):
     def __str__(self):
         return self.email
     
+    def get_detection_accuracy(self):
+        """
+        Calculate detection accuracy percentage
+        """
+        try:
+            counter = self.stats_counter
+        except UserStatsCounter.DoesNotExist:
+            # Users created without save() have no counter row, so no detections yet
+            return 0
+        return counter.get_detection_accuracy()
+    
+    class Meta:
+        verbose_name = _("User")
+        verbose_name_plural = _("Users")
+
+
+class UserStatsCounter(models.Model):
+    """
+    User activity tracking counters
+    
+    Kept in their own narrow table so frequent increments rewrite a small row
+    instead of the wide auth user row.
+    """
+    user = models.OneToOneField(User, on_delete=models.CASCADE, primary_key=True, related_name='stats_counter')
+    total_documents_saved = models.PositiveBigIntegerField(default=0, help_text="Total documents uploaded/saved")
+    total_documents_processed = models.PositiveBigIntegerField(default=0, help_text="Total documents processed")
+    total_documents_shared = models.PositiveBigIntegerField(default=0, help_text="Total documents shared")
+    total_sensitive_items_detected = models.PositiveBigIntegerField(default=0, help_text="Total sensitive items found")
+    total_non_detected_items = models.PositiveBigIntegerField(default=0, help_text="Total items that were not detected as sensitive")
+    
+    def __str__(self):
+        return f"{self.user.email}'s stats"
+    
     def get_detection_accuracy(self):
         """
         Calculate detection accuracy percentage
@@ -34,8 +62,8 @@ class User(AbstractUser):
         return (self.total_sensitive_items_detected / total_items) * 100
     
     class Meta:
-        verbose_name = _("User")
-        verbose_name_plural = _("Users")
+        verbose_name = _("User Stats Counter")
+        verbose_name_plural = _("User Stats Counters")
 
 
 class UserPreference(models.Model):
@@ -60,4 +88,16 @@ class UserPreference(models.Model):
     
     class Meta:
         verbose_name = _("User Preference")
-        verbose_name_plural = _("User Preferences") 
\ No newline at end of file
+        verbose_name_plural = _("User Preferences") 
+
+
+@receiver(post_save, sender=User)
+def create_user_stats_counter(sender, instance, created, raw=False, **kwargs):
+    """
+    Give every new user a counter row
+    
+    Skipped for fixture loading (raw); the stats service creates a missing row
+    on the user's first increment.
+    """
+    if created and not raw:
+        UserStatsCounter.objects.get_or_create(user=instance)
@@ -44,6 +44,11 @@ class UserSerializer(serializers.ModelSerializer):
     User serializer for profile information
     """
     preferences = UserPreferenceSerializer(read_only=True)
+    total_documents_saved = serializers.IntegerField(source='stats_counter.total_documents_saved', read_only=True)
+    total_documents_processed = serializers.IntegerField(source='stats_counter.total_documents_processed', read_only=True)
+    total_documents_shared = serializers.IntegerField(source='stats_counter.total_documents_shared', read_only=True)
+    total_sensitive_items_detected = serializers.IntegerField(source='stats_counter.total_sensitive_items_detected', read_only=True)
+    total_non_detected_items = serializers.IntegerField(source='stats_counter.total_non_detected_items', read_only=True)
     detection_accuracy = serializers.ReadOnlyField()
     
     class Meta:
@@ -63,8 +68,7 @@ class UserSerializer(serializers.ModelSerializer):
             'total_non_detected_items',
             'detection_accuracy'
         ]
-        read_only_fields = ['id', 'email', 'total_documents_saved', 'total_documents_processed', 
-                           'total_documents_shared', 'total_sensitive_items_detected', 'total_non_detected_items']
+        read_only_fields = ['id', 'email']
 
 
 class RegisterSerializer(serializers.ModelSerializer):
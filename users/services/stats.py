@@ -1,14 +1,158 @@
 """
 Enhanced user statistics tracking service
 """
-from django.db import transaction
-from django.contrib.auth import get_user_model
+from collections import Counter, defaultdict
+from django.conf import settings
+from django.core.cache import cache
+from django.db import connection, transaction
 from django.core.exceptions import ValidationError
+from django.db.models import F, FloatField
+from django.db.models.functions import Cast, Coalesce, NullIf
+from ..models import UserStatsCounter
+import atexit
 import logging
+import threading
+import time
 
-User = get_user_model()
+_COUNTERS = UserStatsCounter._default_manager
 logger = logging.getLogger(__name__)
 
+# All activity counter columns on UserStatsCounter
+STAT_FIELDS = (
+    'total_documents_saved',
+    'total_documents_processed',
+    'total_documents_shared',
+    'total_sensitive_items_detected',
+    'total_non_detected_items',
+)
+
+# How long a computed stats dict may be served from cache, in seconds
+USER_STATS_CACHE_TIMEOUT = 60
+
+
+def user_stats_cache_key(user_id):
+    return f'user_stats:{user_id}'
+
+
+def _invalidate_user_stats(*user_ids):
+    """
+    Drop the users' cached stats once the current transaction commits
+    
+    Deleting before the commit would let a concurrent get_user_stats cache the
+    old counters again; outside a transaction this runs immediately.
+    """
+    keys = [user_stats_cache_key(user_id) for user_id in user_ids]
+    transaction.on_commit(lambda: cache.delete_many(keys))
+
+
+def _update_counters(user_id, **field_deltas):
+    """
+    Add the deltas to a user's counters in SQL, creating the row if it is missing
+    
+    Users created without save() (bulk_create, raw SQL, fixtures) never got a
+    row from the post_save receiver, so their first increment creates it.
+    """
+    updates = {field: F(field) + delta for field, delta in field_deltas.items()}
+    if not _COUNTERS.filter(user_id=user_id).update(**updates):
+        _COUNTERS.get_or_create(user_id=user_id)
+        _COUNTERS.filter(user_id=user_id).update(**updates)
+
+
+class StatsBuffer:
+    """
+    In-process write-behind buffer for user statistic counters
+    
+    Deltas are accumulated per (user, field) and written as one UPDATE per user
+    by a background thread every USER_STATS_FLUSH_INTERVAL seconds, so flushes
+    never run inside a caller's transaction. Pending deltas are also flushed
+    when the process exits normally; a killed process loses at most one
+    interval of increments.
+    """
+    _lock = threading.Lock()
+    _pending = defaultdict(Counter)
+    _flusher = None
+    
+    @classmethod
+    def enabled(cls):
+        return getattr(settings, 'USER_STATS_BUFFERED', False)
+    
+    @classmethod
+    def incr(cls, user_id, field, n=1):
+        """
+        Record a pending counter delta for the background flusher to write
+        """
+        with cls._lock:
+            cls._pending[user_id][field] += n
+            if cls._flusher is None or not cls._flusher.is_alive():
+                cls._flusher = threading.Thread(
+                    target=cls._run_flusher,
+                    name='user-stats-flusher',
+                    daemon=True
+                )
+                cls._flusher.start()
+    
+    @classmethod
+    def _run_flusher(cls):
+        """
+        Flush pending deltas every interval on the flusher thread's own connection
+        """
+        while True:
+            time.sleep(getattr(settings, 'USER_STATS_FLUSH_INTERVAL', 10))
+            try:
+                flush_pending_stats()
+            except Exception as e:
+                logger.error("Background stats flush failed: %s", e)
+            finally:
+                connection.close()
+    
+    @classmethod
+    def drain(cls):
+        """
+        Atomically take all pending deltas, leaving the buffer empty
+        """
+        with cls._lock:
+            pending, cls._pending = cls._pending, defaultdict(Counter)
+        return pending
+    
+    @classmethod
+    def requeue(cls, user_id, deltas):
+        """
+        Put deltas back after a failed flush so they are retried next time
+        """
+        with cls._lock:
+            cls._pending[user_id].update(deltas)
+
+
+def flush_pending_stats():
+    """
+    Write all buffered counter deltas to the database, one UPDATE per user
+    
+    Returns:
+        int: Number of users whose counters were flushed
+    """
+    pending = StatsBuffer.drain()
+    flushed = []
+    # Update rows in primary key order so concurrent flushes from other workers
+    # always lock rows in the same order and cannot deadlock
+    for user_id, deltas in sorted(pending.items()):
+        try:
+            # A savepoint per user keeps one failed UPDATE from aborting an
+            # enclosing transaction if the flush is ever called inside one
+            with transaction.atomic():
+                _update_counters(user_id, **deltas)
+            flushed.append(user_id)
+        except Exception as e:
+            logger.error("Failed to flush pending stats for user %s: %s", user_id, e)
+            StatsBuffer.requeue(user_id, deltas)
+    
+    # Invalidate every flushed user's cached stats in one cache round trip
+    if flushed:
+        _invalidate_user_stats(*flushed)
+    return len(flushed)
+
+
+atexit.register(flush_pending_stats)
+
 
 class UserStatsService:
     """
@@ -16,159 +160,248 @@ class UserStatsService:
     """
     
     @staticmethod
-    @transaction.atomic
     def increment_documents_saved(user):
         """
         Safely increment documents saved counter
         """
-        try:
-            user.total_documents_saved += 1
-            user.save(update_fields=['total_documents_saved'])
-            logger.info(f"Incremented documents_saved for user {user.id}")
-        except Exception as e:
-            logger.error(f"Failed to increment documents_saved for user {user.id}: {e}")
-            raise
+        if StatsBuffer.enabled():
+            StatsBuffer.incr(user.pk, 'total_documents_saved', 1)
+            return
+        
+        _update_counters(user.pk, total_documents_saved=1)
+        _invalidate_user_stats(user.pk)
+        logger.debug("Incremented documents_saved for user %s", user.id)
     
     @staticmethod
-    @transaction.atomic
     def increment_documents_processed(user):
         """
         Safely increment documents processed counter
         """
-        try:
-            user.total_documents_processed += 1
-            user.save(update_fields=['total_documents_processed'])
-            logger.info(f"Incremented documents_processed for user {user.id}")
-        except Exception as e:
-            logger.error(f"Failed to increment documents_processed for user {user.id}: {e}")
-            raise
+        if StatsBuffer.enabled():
+            StatsBuffer.incr(user.pk, 'total_documents_processed', 1)
+            return
+        
+        _update_counters(user.pk, total_documents_processed=1)
+        _invalidate_user_stats(user.pk)
+        logger.debug("Incremented documents_processed for user %s", user.id)
     
     @staticmethod
-    @transaction.atomic
     def increment_documents_shared(user):
         """
         Safely increment documents shared counter
         """
-        try:
-            user.total_documents_shared += 1
-            user.save(update_fields=['total_documents_shared'])
-            logger.info(f"Incremented documents_shared for user {user.id}")
-        except Exception as e:
-            logger.error(f"Failed to increment documents_shared for user {user.id}: {e}")
-            raise
+        if StatsBuffer.enabled():
+            StatsBuffer.incr(user.pk, 'total_documents_shared', 1)
+            return
+        
+        _update_counters(user.pk, total_documents_shared=1)
+        _invalidate_user_stats(user.pk)
+        logger.debug("Incremented documents_shared for user %s", user.id)
     
     @staticmethod
-    @transaction.atomic
     def increment_sensitive_items_detected(user, count=1):
         """
         Safely increment sensitive items detected counter
         """
-        try:
-            if count < 0:
-                raise ValueError("Count must be positive")
-            user.total_sensitive_items_detected += count
-            user.save(update_fields=['total_sensitive_items_detected'])
-            logger.info(f"Incremented sensitive_items_detected by {count} for user {user.id}")
-        except Exception as e:
-            logger.error(f"Failed to increment sensitive_items_detected for user {user.id}: {e}")
-            raise
+        if count < 0:
+            raise ValueError("Count must be positive")
+        if count == 0:
+            return
+        if StatsBuffer.enabled():
+            StatsBuffer.incr(user.pk, 'total_sensitive_items_detected', count)
+            return
+        
+        _update_counters(user.pk, total_sensitive_items_detected=count)
+        _invalidate_user_stats(user.pk)
+        logger.debug("Incremented sensitive_items_detected by %s for user %s", count, user.id)
     
     @staticmethod
-    @transaction.atomic
     def increment_non_detected_items(user, count=1):
         """
         Safely increment non-detected items counter
         """
+        if count < 0:
+            raise ValueError("Count must be positive")
+        if count == 0:
+            return
+        if StatsBuffer.enabled():
+            StatsBuffer.incr(user.pk, 'total_non_detected_items', count)
+            return
+        
+        _update_counters(user.pk, total_non_detected_items=count)
+        _invalidate_user_stats(user.pk)
+        logger.debug("Incremented non_detected_items by %s for user %s", count, user.id)
+    
+    @staticmethod
+    def increment_many(user, **field_deltas):
+        """
+        Increment several counters at once with a single UPDATE
+        
+        Example: increment_many(user, total_documents_saved=1, total_documents_processed=1)
+        """
+        unknown = set(field_deltas) - set(STAT_FIELDS)
+        if unknown:
+            raise ValueError(f"Unknown stat fields: {', '.join(sorted(unknown))}")
+        if any(delta < 0 for delta in field_deltas.values()):
+            raise ValueError("Counts must be non-negative")
+        field_deltas = {field: delta for field, delta in field_deltas.items() if delta}
+        if not field_deltas:
+            return
+        if StatsBuffer.enabled():
+            for field, delta in field_deltas.items():
+                StatsBuffer.incr(user.pk, field, delta)
+            return
+        
+        _update_counters(user.pk, **field_deltas)
+        _invalidate_user_stats(user.pk)
+        logger.debug("Incremented %s for user %s", field_deltas, user.id)
+    
+    @staticmethod
+    def increment_and_return(user_id, field, count=1):
+        """
+        Increment one counter and return its new value in the same round trip
+        
+        Uses UPDATE ... RETURNING, so it always writes straight to the database
+        and does not include deltas still pending in the write-behind buffer.
+        
+        Returns:
+            int: The counter value after the increment
+        """
+        if field not in STAT_FIELDS:
+            raise ValueError(f"Unknown stat field: {field}")
+        if count < 0:
+            raise ValueError("Count must be positive")
+        
+        quote = connection.ops.quote_name
+        table = quote(UserStatsCounter._meta.db_table)
+        column = quote(UserStatsCounter._meta.get_field(field).column)
+        pk_column = quote(UserStatsCounter._meta.pk.column)
+        sql = f"UPDATE {table} SET {column} = {column} + %s WHERE {pk_column} = %s RETURNING {column}"
+        with connection.cursor() as cursor:
+            cursor.execute(sql, [count, user_id])
+            row = cursor.fetchone()
+            if row is None:
+                # Users created without save() have no stats row until first use
+                _COUNTERS.get_or_create(user_id=user_id)
+                cursor.execute(sql, [count, user_id])
+                row = cursor.fetchone()
+        
+        _invalidate_user_stats(user_id)
+        return row[0]
+    
+    @staticmethod
+    def update_stats_after_analysis(user, sensitive_count=0, non_sensitive_count=0):
+        """
+        Update multiple statistics after document analysis
+        """
         try:
-            if count < 0:
-                raise ValueError("Count must be positive")
-            user.total_non_detected_items += count
-            user.save(update_fields=['total_non_detected_items'])
-            logger.info(f"Incremented non_detected_items by {count} for user {user.id}")
+            if sensitive_count < 0 or non_sensitive_count < 0:
+                raise ValueError("Counts must be non-negative")
+            if sensitive_count == 0 and non_sensitive_count == 0:
+                return
+            
+            # Add in SQL so concurrent analyses for the same user cannot lose updates
+            _update_counters(
+                user.pk,
+                total_sensitive_items_detected=sensitive_count,
+                total_non_detected_items=non_sensitive_count
+            )
+            _invalidate_user_stats(user.pk)
+            
+            logger.debug("Updated stats for user %s: +%s sensitive, +%s non-sensitive", user.id, sensitive_count, non_sensitive_count)
         except Exception as e:
-            logger.error(f"Failed to increment non_detected_items for user {user.id}: {e}")
+            logger.error("Failed to update stats for user %s: %s", user.id, e)
             raise
     
     @staticmethod
     @transaction.atomic
-    def update_stats_after_analysis(user, sensitive_count=0, non_sensitive_count=0):
+    def update_stats_after_analysis_bulk(deltas):
         """
-        Update multiple statistics after document analysis
+        Apply analysis statistics for many users in a handful of UPDATEs
+        
+        Per-document callers should accumulate their counts into a dict and
+        call this once at the end of the request or batch.
+        
+        Args:
+            deltas (dict): Maps user id to a (sensitive_count, non_sensitive_count) tuple
         """
         try:
-            if sensitive_count < 0 or non_sensitive_count < 0:
+            if any(sens < 0 or nonsens < 0 for sens, nonsens in deltas.values()):
                 raise ValueError("Counts must be non-negative")
+            deltas = {user_id: counts for user_id, counts in deltas.items() if any(counts)}
+            if not deltas:
+                return
             
-            user.total_sensitive_items_detected += sensitive_count
-            user.total_non_detected_items += non_sensitive_count
+            # Unsaved instances carrying F() expressions let bulk_update add the
+            # deltas in SQL, so no rows need to be read and no update is lost
+            counters = []
+            for user_id, (sensitive_count, non_sensitive_count) in deltas.items():
+                counter = UserStatsCounter(user_id=user_id)
+                counter.total_sensitive_items_detected = F('total_sensitive_items_detected') + sensitive_count
+                counter.total_non_detected_items = F('total_non_detected_items') + non_sensitive_count
+                counters.append(counter)
             
-            user.save(update_fields=[
-                'total_sensitive_items_detected',
-                'total_non_detected_items'
-            ])
+            # bulk_update skips missing rows, so create any the post_save
+            # receiver never made (users created via bulk_create or raw SQL)
+            _COUNTERS.bulk_create(
+                [UserStatsCounter(user_id=user_id) for user_id in deltas],
+                ignore_conflicts=True
+            )
+            _COUNTERS.bulk_update(
+                counters,
+                ['total_sensitive_items_detected', 'total_non_detected_items'],
+                batch_size=1000
+            )
+            _invalidate_user_stats(*deltas)
             
-            logger.info(f"Updated stats for user {user.id}: +{sensitive_count} sensitive, +{non_sensitive_count} non-sensitive")
+            logger.info("Updated analysis stats for %s users", len(counters))
         except Exception as e:
-            logger.error(f"Failed to update stats for user {user.id}: {e}")
+            logger.error("Failed to bulk update stats: %s", e)
             raise
     
     @staticmethod
-    def get_user_stats(user):
+    def get_user_stats(user=None, user_id=None):
         """
-        Get current user statistics
+        Get current user statistics, served from cache for up to a minute
+        
+        The counters and detection accuracy are read from the stats counter row
+        in one query. Accepts either a user instance or just its id.
         """
-        return {
-            'total_documents_saved': user.total_documents_saved,
-            'total_documents_processed': user.total_documents_processed,
-            'total_documents_shared': user.total_documents_shared,
-            'total_sensitive_items_detected': user.total_sensitive_items_detected,
-            'total_non_detected_items': user.total_non_detected_items,
-            'detection_accuracy': user.get_detection_accuracy()
-        }
+        if user_id is None:
+            user_id = user.pk
+        key = user_stats_cache_key(user_id)
+        stats = cache.get(key)
+        if stats is None:
+            sensitive = Cast(F('total_sensitive_items_detected'), FloatField())
+            total = Cast(F('total_sensitive_items_detected') + F('total_non_detected_items'), FloatField())
+            stats = _COUNTERS.filter(user_id=user_id).annotate(
+                detection_accuracy=Coalesce(sensitive * 100 / NullIf(total, 0), 0.0, output_field=FloatField())
+            ).values(*STAT_FIELDS, 'detection_accuracy').first()
+            if stats is not None:
+                cache.set(key, stats, USER_STATS_CACHE_TIMEOUT)
+        return stats
     
     @staticmethod
-    def reset_user_stats(user):
+    def reset_user_stats(user=None, user_id=None):
         """
         Reset all user statistics to zero (for testing/admin purposes)
+        
+        Accepts either a user instance or just its id, so callers need not load the row.
         """
+        if user_id is None:
+            user_id = user.pk
         try:
-            user.total_documents_saved = 0
-            user.total_documents_processed = 0
-            user.total_documents_shared = 0
-            user.total_sensitive_items_detected = 0
-            user.total_non_detected_items = 0
-            
-            user.save(update_fields=[
-                'total_documents_saved',
-                'total_documents_processed', 
-                'total_documents_shared',
-                'total_sensitive_items_detected',
-                'total_non_detected_items'
-            ])
-            
-            logger.info(f"Reset all stats for user {user.id}")
+            _COUNTERS.filter(user_id=user_id).update(**{field: 0 for field in STAT_FIELDS})
+            _invalidate_user_stats(user_id)
+            logger.info("Reset all stats for user %s", user_id)
         except Exception as e:
-            logger.error(f"Failed to reset stats for user {user.id}: {e}")
+            logger.error("Failed to reset stats for user %s: %s", user_id, e)
             raise
 
 
-# Convenience functions for backward compatibility
-def increment_documents_saved(user):
-    """Backward compatibility wrapper"""
-    UserStatsService.increment_documents_saved(user)
-
-def increment_documents_processed(user):
-    """Backward compatibility wrapper"""
-    UserStatsService.increment_documents_processed(user)
-
-def increment_documents_shared(user):
-    """Backward compatibility wrapper"""
-    UserStatsService.increment_documents_shared(user)
-
-def increment_sensitive_items_detected(user, count=1):
-    """Backward compatibility wrapper"""
-    UserStatsService.increment_sensitive_items_detected(user, count)
-
-def increment_non_detected_items(user, count=1):
-    """Backward compatibility wrapper"""
-    UserStatsService.increment_non_detected_items(user, count)
+# Convenience aliases for backward compatibility
+increment_documents_saved = UserStatsService.increment_documents_saved
+increment_documents_processed = UserStatsService.increment_documents_processed
+increment_documents_shared = UserStatsService.increment_documents_shared
+increment_sensitive_items_detected = UserStatsService.increment_sensitive_items_detected
+increment_non_detected_items = UserStatsService.increment_non_detected_items
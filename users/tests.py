@@ -0,0 +1,126 @@
+from unittest.mock import patch
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import DatabaseError, transaction
+from django.test import TestCase, override_settings
+from users import utils
+from users.services.stats import StatsBuffer, UserStatsService, flush_pending_stats, _COUNTERS
+
+User = get_user_model()
+
+
+@override_settings(USER_STATS_BUFFERED=True, USER_STATS_FLUSH_INTERVAL=3600)
+class StatsBufferTests(TestCase):
+    """
+    Tests for the write-behind stats buffer
+    """
+
+    def setUp(self):
+        StatsBuffer.drain()
+        self.alice = User.objects.create_user(username='alice', email='alice@example.com', password='x')
+        self.bob = User.objects.create_user(username='bob', email='bob@example.com', password='x')
+
+    def tearDown(self):
+        StatsBuffer.drain()
+
+    def test_increment_does_not_write_inside_caller_transaction(self):
+        for _ in range(5):
+            UserStatsService.increment_documents_saved(self.alice)
+
+        with self.assertRaises(RuntimeError):
+            with transaction.atomic():
+                UserStatsService.increment_documents_saved(self.bob)
+                raise RuntimeError
+
+        # Alice's deltas were neither written nor rolled back by Bob's transaction
+        self.alice.stats_counter.refresh_from_db()
+        self.assertEqual(self.alice.stats_counter.total_documents_saved, 0)
+
+        self.assertEqual(flush_pending_stats(), 2)
+        self.alice.stats_counter.refresh_from_db()
+        self.assertEqual(self.alice.stats_counter.total_documents_saved, 5)
+
+    def test_failed_user_update_is_requeued_and_retried(self):
+        UserStatsService.increment_documents_saved(self.alice)
+        UserStatsService.increment_documents_saved(self.bob)
+
+        real_filter = _COUNTERS.filter
+        calls = []
+
+        def failing_first_filter(*args, **kwargs):
+            calls.append(kwargs)
+            if len(calls) == 1:
+                raise DatabaseError("simulated failure")
+            return real_filter(*args, **kwargs)
+
+        with transaction.atomic():
+            with patch.object(_COUNTERS, 'filter', side_effect=failing_first_filter):
+                self.assertEqual(flush_pending_stats(), 1)
+            # The enclosing transaction is still usable after the failed UPDATE
+            self.assertTrue(User.objects.filter(pk=self.bob.pk).exists())
+
+        self.bob.stats_counter.refresh_from_db()
+        self.assertEqual(self.bob.stats_counter.total_documents_saved, 1)
+
+        # Alice's update failed, so her delta waits for the next flush
+        self.assertEqual(flush_pending_stats(), 1)
+        self.alice.stats_counter.refresh_from_db()
+        self.assertEqual(self.alice.stats_counter.total_documents_saved, 1)
+
+
+class UserUtilsTests(TestCase):
+    """
+    Tests for the legacy counter helpers
+    """
+
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(username='carol', email='carol@example.com', password='x')
+
+    def test_helpers_update_counter_and_invalidate_cached_stats(self):
+        self.assertEqual(UserStatsService.get_user_stats(self.user)['total_documents_saved'], 0)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            utils.increment_documents_saved(self.user)
+            utils.increment_sensitive_items_detected(self.user, 3)
+
+        stats = UserStatsService.get_user_stats(self.user)
+        self.assertEqual(stats['total_documents_saved'], 1)
+        self.assertEqual(stats['total_sensitive_items_detected'], 3)
+
+
+class UserStatsServiceTests(TestCase):
+    """
+    Tests for cached stats invalidation
+    """
+
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(username='dave', email='dave@example.com', password='x')
+
+    def test_bulk_update_invalidates_cache_only_after_commit(self):
+        self.assertEqual(UserStatsService.get_user_stats(self.user)['total_sensitive_items_detected'], 0)
+
+        with self.captureOnCommitCallbacks() as callbacks:
+            UserStatsService.update_stats_after_analysis_bulk({self.user.pk: (2, 1)})
+            # Still inside the transaction, so the cached stats are left alone
+            self.assertEqual(UserStatsService.get_user_stats(self.user)['total_sensitive_items_detected'], 0)
+
+        self.assertEqual(len(callbacks), 1)
+        callbacks[0]()
+        stats = UserStatsService.get_user_stats(self.user)
+        self.assertEqual(stats['total_sensitive_items_detected'], 2)
+        self.assertEqual(stats['total_non_detected_items'], 1)
+
+    def test_increment_creates_missing_counter_row(self):
+        # bulk_create skips save(), so the post_save receiver never runs
+        user = User.objects.bulk_create([User(username='erin', email='erin@example.com')])[0]
+        self.assertFalse(_COUNTERS.filter(user_id=user.pk).exists())
+        self.assertEqual(user.get_detection_accuracy(), 0)
+
+        UserStatsService.increment_documents_saved(user)
+        UserStatsService.update_stats_after_analysis_bulk({user.pk: (1, 0)})
+
+        counter = _COUNTERS.get(user_id=user.pk)
+        self.assertEqual(counter.total_documents_saved, 1)
+        self.assertEqual(counter.total_sensitive_items_detected, 1)